@@ -1,12 +1,14 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import re
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
 from bson import ObjectId
 
@@ -18,6 +20,33 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Depot (tenant) configuration
+# DEPOT_STORAGE: "shared" keeps every depot in the same collections,
+# "collection" gives each depot its own prefixed collections and
+# "database" gives each depot its own database.
+DEPOT_STORAGE = os.environ.get('DEPOT_STORAGE', 'shared')
+DEPOT_HEADER = 'X-Depot-Id'
+# Lowercase only: MongoDB rejects database names that differ only by case
+DEPOT_ID_RE = re.compile(r'^[a-z0-9_-]{1,32}$')
+DEPOT_PATH_RE = re.compile(r'^/api/depots/(?P<depot_id>[^/]+)(?P<rest>/.*)$')
+DEPOT_RAW_PATH_RE = re.compile(rb'^/api/depots/[^/]+(?P<rest>/.*)$')
+# Routes that span every depot and so cannot be reached under a depot prefix
+GLOBAL_ROUTES = ('/depots', '/rollups/', '/maintenance/assign-default-depot')
+MAX_DB_NAME_LENGTH = 63
+
+if DEPOT_STORAGE not in ('shared', 'collection', 'database'):
+    raise RuntimeError(f"Unsupported DEPOT_STORAGE: {DEPOT_STORAGE}")
+
+def normalize_depot_id(depot_id: str) -> str:
+    depot_id = depot_id.lower()
+    if not DEPOT_ID_RE.match(depot_id):
+        raise ValueError("Depot id must be 1-32 letters, digits, '_' or '-'")
+    if DEPOT_STORAGE == 'database' and len(f"{db.name}_{depot_id}") > MAX_DB_NAME_LENGTH:
+        raise ValueError(f"Depot id too long for a database name (max {MAX_DB_NAME_LENGTH} characters)")
+    return depot_id
+
+DEFAULT_DEPOT = normalize_depot_id(os.environ.get('DEFAULT_DEPOT', 'default'))
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -32,6 +61,7 @@ class ReconciliationReason(BaseModel):
 class DeliveryCreate(BaseModel):
     date: str  # YYYY-MM-DD format
     employee_name: str
+    employee_id: Optional[str] = None  # resolved from employee_name when omitted
     cylinders_delivered: int
     empty_received: int
     online_payments: int
@@ -65,28 +95,309 @@ class Settings(BaseModel):
     price_history: List[dict] = []
     updated_at: datetime
 
+class DepotCreate(BaseModel):
+    depot_id: str
+
+# ============= Depots =============
+
+class Depot:
+    """Collections and query scope for a single depot."""
+
+    def __init__(self, depot_id: str):
+        self.id = depot_id
+        if DEPOT_STORAGE == 'database':
+            self.db = client[f"{db.name}_{depot_id}"]
+            prefix = ""
+        elif DEPOT_STORAGE == 'collection':
+            self.db = db
+            prefix = f"{depot_id}_"
+        else:
+            self.db = db
+            prefix = ""
+        self.settings = self.db[f"{prefix}settings"]
+        self.employees = self.db[f"{prefix}employees"]
+        self.deliveries = self.db[f"{prefix}deliveries"]
+
+    def scope(self, query: Optional[dict] = None) -> dict:
+        # depot_id is stored and filtered on in every storage mode so the
+        # depot-prefixed indexes are always usable
+        return {"depot_id": self.id, **(query or {})}
+
+# Depots known to exist in the registry and whose indexes are in place
+_ready_depots = set()
+
+async def ensure_depot(depot: Depot):
+    if depot.id in _ready_depots:
+        return
+    await depot.settings.create_index([("depot_id", 1)])
+    await depot.employees.create_index([("depot_id", 1), ("name", 1), ("active", 1)])
+    await depot.deliveries.create_index([("depot_id", 1), ("employee_id", 1), ("date", 1)])
+    await depot.deliveries.create_index([("depot_id", 1), ("date", 1)])
+    await depot.deliveries.create_index([("depot_id", 1), ("employee_name", 1)])
+    _ready_depots.add(depot.id)
+
+async def register_depot(depot_id: str) -> bool:
+    """Add a depot to the registry; returns False if it already existed."""
+    result = await db.depots.update_one(
+        {"_id": depot_id},
+        {"$setOnInsert": {"created_at": datetime.utcnow()}},
+        upsert=True
+    )
+    await ensure_depot(Depot(depot_id))
+    return result.upserted_id is not None
+
+async def list_depot_ids() -> List[str]:
+    depots = await db.depots.find({}, {"_id": 1}).sort("_id", 1).to_list(None)
+    return [d['_id'] for d in depots]
+
+async def get_depot(request: Request) -> Depot:
+    """Resolve the depot from the /api/depots/{id} prefix or the X-Depot-Id header."""
+    depot_id = (
+        getattr(request.state, 'depot_id', None)
+        or request.headers.get(DEPOT_HEADER)
+        or DEFAULT_DEPOT
+    )
+    try:
+        depot_id = normalize_depot_id(depot_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    depot = Depot(depot_id)
+    if depot_id not in _ready_depots:
+        # Depots are only created through POST /api/depots
+        if not await db.depots.find_one({"_id": depot_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Depot not found")
+        await ensure_depot(depot)
+    return depot
+
+def merge_settings(current: dict, legacy: dict) -> dict:
+    """Combine two settings documents, keeping the most recently saved price."""
+    newest = max(current, legacy, key=lambda doc: doc.get('updated_at') or datetime.min)
+    price_history = current.get('price_history', []) + legacy.get('price_history', [])
+    price_history.sort(key=lambda entry: entry.get('date', ''))
+    return {
+        "cylinder_price": newest['cylinder_price'],
+        "price_history": price_history,
+        "updated_at": newest.get('updated_at') or datetime.utcnow()
+    }
+
+async def migrate_legacy_documents() -> dict:
+    """Move documents created before depots into the default depot.
+
+    Safe to run repeatedly: only documents without a depot_id are touched.
+    """
+    depot = Depot(DEFAULT_DEPOT)
+    unassigned = {"depot_id": {"$exists": False}}
+    moved = {}
+
+    # Settings are merged so the default depot never ends up with two documents
+    count = 0
+    async for legacy in db.settings.find(unassigned):
+        current = await depot.settings.find_one(depot.scope())
+        if current:
+            # Claim the legacy document before merging so that concurrent
+            # runs (several workers starting at once) merge it only once
+            claimed = await db.settings.find_one_and_delete({"_id": legacy['_id'], **unassigned})
+            if not claimed:
+                continue
+            await depot.settings.update_one(
+                {"_id": current['_id']},
+                {"$set": merge_settings(current, claimed)}
+            )
+        else:
+            legacy['depot_id'] = depot.id
+            await depot.settings.replace_one({"_id": legacy['_id']}, legacy, upsert=True)
+            if DEPOT_STORAGE != 'shared':
+                await db.settings.delete_one({"_id": legacy['_id']})
+        count += 1
+    moved['settings'] = count
+
+    for name in ("employees", "deliveries"):
+        legacy = db[name]
+        if DEPOT_STORAGE == 'shared':
+            result = await legacy.update_many(unassigned, {"$set": {"depot_id": depot.id}})
+            moved[name] = result.modified_count
+            continue
+
+        # Separate storage: copy into the depot's collection keeping the _id,
+        # so employee_id references stay valid, then drop the legacy copy
+        target = getattr(depot, name)
+        count = 0
+        async for doc in legacy.find(unassigned):
+            doc['depot_id'] = depot.id
+            await target.replace_one({"_id": doc['_id']}, doc, upsert=True)
+            await legacy.delete_one({"_id": doc['_id']})
+            count += 1
+        moved[name] = count
+
+    return moved
+
+class DepotPathMiddleware:
+    """Serve /api/depots/{depot_id}/... with the regular /api/... routes.
+
+    Routes in GLOBAL_ROUTES are left unrewritten, so they 404 under a prefix.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            match = DEPOT_PATH_RE.match(scope["path"])
+            if match and not match.group("rest").startswith(GLOBAL_ROUTES):
+                scope = {
+                    **scope,
+                    "path": "/api" + match.group("rest"),
+                    "state": {**scope.get("state", {}), "depot_id": match.group("depot_id")},
+                }
+                raw_match = DEPOT_RAW_PATH_RE.match(scope.get("raw_path") or b"")
+                if raw_match:
+                    # Keep the client's percent-encoding intact
+                    scope["raw_path"] = b"/api" + raw_match.group("rest")
+        await self.app(scope, receive, send)
+
+# ============= Helpers =============
+
+def parse_object_id(value: str, label: str) -> ObjectId:
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail=f"Invalid {label} id")
+    return ObjectId(value)
+
+def pick_employee(candidates: List[dict]) -> Tuple[Optional[dict], bool]:
+    """Pick the employee a name refers to, preferring active employees.
+
+    Returns (employee, ambiguous). When more than one employee is equally
+    preferred the name is ambiguous and no employee is picked.
+    """
+    active = [emp for emp in candidates if emp.get('active', False)]
+    preferred = active or candidates
+    if len(preferred) > 1:
+        return None, True
+    return (preferred[0] if preferred else None), False
+
+async def find_employee(depot: Depot, employee_id: str) -> dict:
+    employee = await depot.employees.find_one(
+        depot.scope({"_id": parse_object_id(employee_id, "employee")}),
+        {"name": 1}
+    )
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return employee
+
+async def resolve_employee(depot: Depot, delivery: DeliveryCreate) -> Optional[dict]:
+    """Return the employee (_id and name) a delivery belongs to.
+
+    An explicit employee_id wins; otherwise the employee_name is looked up,
+    preferring an active employee over a soft-deleted one with the same name.
+    """
+    if delivery.employee_id:
+        return await find_employee(depot, delivery.employee_id)
+
+    candidates = await depot.employees.find(
+        depot.scope({"name": delivery.employee_name}),
+        {"name": 1, "active": 1}
+    ).to_list(None)
+    employee, ambiguous = pick_employee(candidates)
+    if ambiguous:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Employee name '{delivery.employee_name}' matches several employees; send employee_id"
+        )
+    return employee
+
+async def delivery_document(depot: Depot, delivery: DeliveryCreate, stored: Optional[dict] = None) -> dict:
+    """Build the stored fields of a delivery with its employee reference resolved.
+
+    When updating, an unchanged employee_name keeps the stored employee_id so
+    a later namesake never takes over the delivery.
+    """
+    delivery_dict = delivery.dict()
+    if (
+        stored
+        and not delivery.employee_id
+        and stored.get('employee_id') is not None
+        and stored.get('employee_name') == delivery.employee_name
+    ):
+        delivery_dict['employee_id'] = stored['employee_id']
+        return delivery_dict
+
+    employee = await resolve_employee(depot, delivery)
+    if employee:
+        delivery_dict['employee_id'] = employee['_id']
+        # Keep the denormalized name in step with the referenced employee
+        delivery_dict['employee_name'] = employee['name']
+    else:
+        delivery_dict['employee_id'] = None
+    return delivery_dict
+
+def apply_date_range(query: dict, start_date: Optional[str], end_date: Optional[str]) -> dict:
+    date_range = {}
+    if start_date:
+        date_range["$gte"] = start_date
+    if end_date:
+        date_range["$lte"] = end_date
+    if date_range:
+        query["date"] = date_range
+    return query
+
+DELIVERY_TOTAL_FIELDS = {
+    "total_cylinders_delivered": "cylinders_delivered",
+    "total_empty_received": "empty_received",
+    "total_online_payments": "online_payments",
+    "total_paytm_payments": "paytm_payments",
+    "total_partial_digital": "partial_digital_amount",
+    "total_cash_collected": "cash_collected",
+}
+
+def empty_delivery_totals() -> dict:
+    return {"total_deliveries": 0, **{total: 0 for total in DELIVERY_TOTAL_FIELDS}}
+
+async def aggregate_delivery_totals(depot: Depot, match: dict) -> dict:
+    group = {"_id": None, "total_deliveries": {"$sum": 1}}
+    for total, field in DELIVERY_TOTAL_FIELDS.items():
+        group[total] = {"$sum": f"${field}"}
+
+    pipeline = [{"$match": depot.scope(match)}, {"$group": group}]
+    result = await depot.deliveries.aggregate(pipeline).to_list(1)
+    if not result:
+        return empty_delivery_totals()
+
+    totals = result[0]
+    del totals['_id']
+    return totals
+
+def serialize_delivery(delivery: dict) -> dict:
+    delivery['id'] = str(delivery['_id'])
+    del delivery['_id']
+    delivery.pop('depot_id', None)
+    if delivery.get('employee_id') is not None:
+        delivery['employee_id'] = str(delivery['employee_id'])
+    return delivery
+
 # ============= Settings Endpoints =============
 
 @api_router.get("/settings")
-async def get_settings():
-    settings = await db.settings.find_one()
+async def get_settings(depot: Depot = Depends(get_depot)):
+    settings = await depot.settings.find_one(depot.scope())
     if not settings:
         # Create default settings
         default_settings = {
+            "depot_id": depot.id,
             "cylinder_price": 877.5,
             "price_history": [{"date": datetime.utcnow().isoformat(), "price": 877.5}],
             "updated_at": datetime.utcnow()
         }
-        await db.settings.insert_one(default_settings)
+        await depot.settings.insert_one(default_settings)
         settings = default_settings
     
     settings['id'] = str(settings['_id'])
     del settings['_id']
+    settings.pop('depot_id', None)
     return settings
 
 @api_router.put("/settings")
-async def update_settings(settings_update: SettingsUpdate):
-    current_settings = await db.settings.find_one()
+async def update_settings(settings_update: SettingsUpdate, depot: Depot = Depends(get_depot)):
+    current_settings = await depot.settings.find_one(depot.scope())
     
     price_history = current_settings.get('price_history', []) if current_settings else []
     price_history.append({
@@ -95,108 +406,200 @@ async def update_settings(settings_update: SettingsUpdate):
     })
     
     update_data = {
+        "depot_id": depot.id,
         "cylinder_price": settings_update.cylinder_price,
         "price_history": price_history,
         "updated_at": datetime.utcnow()
     }
     
     if current_settings:
-        await db.settings.update_one({"_id": current_settings["_id"]}, {"$set": update_data})
+        await depot.settings.update_one({"_id": current_settings["_id"]}, {"$set": update_data})
     else:
-        await db.settings.insert_one(update_data)
+        await depot.settings.insert_one(update_data)
     
     return {"message": "Settings updated successfully", "cylinder_price": settings_update.cylinder_price}
 
 # ============= Employee Endpoints =============
 
 @api_router.post("/employees", response_model=Employee)
-async def create_employee(employee: EmployeeCreate):
+async def create_employee(employee: EmployeeCreate, depot: Depot = Depends(get_depot)):
     employee_dict = {
+        "depot_id": depot.id,
         "name": employee.name,
         "active": True,
         "created_at": datetime.utcnow()
     }
-    result = await db.employees.insert_one(employee_dict)
+    result = await depot.employees.insert_one(employee_dict)
     employee_dict['id'] = str(result.inserted_id)
     del employee_dict['_id']
     return employee_dict
 
 @api_router.get("/employees", response_model=List[Employee])
-async def get_employees():
-    employees = await db.employees.find({"active": True}).to_list(1000)
+async def get_employees(depot: Depot = Depends(get_depot)):
+    employees = await depot.employees.find(depot.scope({"active": True})).to_list(1000)
     for emp in employees:
         emp['id'] = str(emp['_id'])
         del emp['_id']
     return employees
 
 @api_router.delete("/employees/{employee_id}")
-async def delete_employee(employee_id: str):
-    result = await db.employees.update_one(
-        {"_id": ObjectId(employee_id)},
+async def delete_employee(employee_id: str, depot: Depot = Depends(get_depot)):
+    result = await depot.employees.update_one(
+        depot.scope({"_id": parse_object_id(employee_id, "employee")}),
         {"$set": {"active": False}}
     )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Employee not found")
     return {"message": "Employee deleted successfully"}
 
+@api_router.get("/employees/{employee_id}/deliveries", response_model=List[Delivery])
+async def get_employee_deliveries(
+    employee_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    depot: Depot = Depends(get_depot)
+):
+    employee = await find_employee(depot, employee_id)
+    query = depot.scope({"employee_id": employee['_id']})
+    apply_date_range(query, start_date, end_date)
+
+    # Served by the (depot_id, employee_id, date) index
+    deliveries = await depot.deliveries.find(query).sort("date", -1).to_list(1000)
+    return [serialize_delivery(d) for d in deliveries]
+
+@api_router.get("/employees/{employee_id}/summary")
+async def get_employee_summary(
+    employee_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    depot: Depot = Depends(get_depot)
+):
+    employee = await find_employee(depot, employee_id)
+    match = {"employee_id": employee['_id']}
+    apply_date_range(match, start_date, end_date)
+
+    summary = await aggregate_delivery_totals(depot, match)
+    summary['employee_id'] = employee_id
+    return summary
+
 # ============= Delivery Endpoints =============
 
 @api_router.post("/deliveries", response_model=Delivery)
-async def create_delivery(delivery: DeliveryCreate):
-    delivery_dict = delivery.dict()
+async def create_delivery(delivery: DeliveryCreate, depot: Depot = Depends(get_depot)):
+    delivery_dict = await delivery_document(depot, delivery)
+    delivery_dict['depot_id'] = depot.id
     delivery_dict['created_at'] = datetime.utcnow()
-    result = await db.deliveries.insert_one(delivery_dict)
-    delivery_dict['id'] = str(result.inserted_id)
-    del delivery_dict['_id']
-    return delivery_dict
+    await depot.deliveries.insert_one(delivery_dict)
+    return serialize_delivery(delivery_dict)
 
 @api_router.get("/deliveries/date/{date}", response_model=List[Delivery])
-async def get_deliveries_by_date(date: str):
-    deliveries = await db.deliveries.find({"date": date}).to_list(1000)
-    for delivery in deliveries:
-        delivery['id'] = str(delivery['_id'])
-        del delivery['_id']
-    return deliveries
+async def get_deliveries_by_date(date: str, depot: Depot = Depends(get_depot)):
+    deliveries = await depot.deliveries.find(depot.scope({"date": date})).to_list(1000)
+    return [serialize_delivery(d) for d in deliveries]
 
 @api_router.put("/deliveries/{delivery_id}")
-async def update_delivery(delivery_id: str, delivery: DeliveryCreate):
-    result = await db.deliveries.update_one(
-        {"_id": ObjectId(delivery_id)},
-        {"$set": delivery.dict()}
-    )
-    if result.modified_count == 0:
+async def update_delivery(delivery_id: str, delivery: DeliveryCreate, depot: Depot = Depends(get_depot)):
+    query = depot.scope({"_id": parse_object_id(delivery_id, "delivery")})
+    stored = await depot.deliveries.find_one(query, {"employee_id": 1, "employee_name": 1})
+    if not stored:
         raise HTTPException(status_code=404, detail="Delivery not found")
+
+    update_data = await delivery_document(depot, delivery, stored)
+    await depot.deliveries.update_one(query, {"$set": update_data})
     return {"message": "Delivery updated successfully"}
 
 @api_router.get("/deliveries/summary/{date}")
-async def get_daily_summary(date: str):
-    deliveries = await db.deliveries.find({"date": date}).to_list(1000)
-    
-    if not deliveries:
-        return {
-            "total_cylinders_delivered": 0,
-            "total_empty_received": 0,
-            "total_online_payments": 0,
-            "total_paytm_payments": 0,
-            "total_partial_digital": 0,
-            "total_cash_collected": 0
-        }
-    
-    summary = {
-        "total_cylinders_delivered": sum(d['cylinders_delivered'] for d in deliveries),
-        "total_empty_received": sum(d['empty_received'] for d in deliveries),
-        "total_online_payments": sum(d['online_payments'] for d in deliveries),
-        "total_paytm_payments": sum(d['paytm_payments'] for d in deliveries),
-        "total_partial_digital": sum(d['partial_digital_amount'] for d in deliveries),
-        "total_cash_collected": sum(d['cash_collected'] for d in deliveries)
+async def get_daily_summary(date: str, depot: Depot = Depends(get_depot)):
+    return await aggregate_delivery_totals(depot, {"date": date})
+
+# ============= Depot Endpoints =============
+
+@api_router.get("/depots")
+async def get_depots():
+    return {"depots": await list_depot_ids()}
+
+@api_router.post("/depots")
+async def create_depot(depot: DepotCreate):
+    try:
+        depot_id = normalize_depot_id(depot.depot_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not await register_depot(depot_id):
+        raise HTTPException(status_code=409, detail="Depot already exists")
+    return {"message": "Depot created successfully", "depot_id": depot_id}
+
+@api_router.get("/rollups/summary/{date}")
+async def get_cross_depot_summary(date: str):
+    """Daily summary across every depot, aggregated per depot in parallel."""
+    depot_ids = await list_depot_ids()
+    summaries = await asyncio.gather(
+        *(aggregate_delivery_totals(Depot(depot_id), {"date": date}) for depot_id in depot_ids)
+    )
+
+    totals = empty_delivery_totals()
+    for summary in summaries:
+        for key in totals:
+            totals[key] += summary[key]
+
+    return {
+        "date": date,
+        "depots": dict(zip(depot_ids, summaries)),
+        "totals": totals
     }
-    
-    return summary
+
+# ============= Maintenance Endpoints =============
+
+@api_router.post("/maintenance/backfill-employee-ids")
+async def backfill_employee_ids(depot: Depot = Depends(get_depot)):
+    """One-shot backfill of employee_id on deliveries that only carry a name."""
+    employees = await depot.employees.find(depot.scope(), {"name": 1}).to_list(None)
+    employees_by_name = {}
+    for emp in employees:
+        employees_by_name.setdefault(emp['name'], []).append(emp)
+
+    updated = 0
+    unresolved = set()
+    ambiguous = set()
+    names = await depot.deliveries.distinct("employee_name", depot.scope({"employee_id": None}))
+    for name in names:
+        # Unlike create/update, soft-deleted employees count as matches too:
+        # old rows may belong to a former employee whose name was reused
+        candidates = employees_by_name.get(name, [])
+        if len(candidates) > 1:
+            ambiguous.add(name)
+            continue
+        if not candidates:
+            unresolved.add(name)
+            continue
+        result = await depot.deliveries.update_many(
+            depot.scope({"employee_name": name, "employee_id": None}),
+            {"$set": {"employee_id": candidates[0]['_id']}}
+        )
+        updated += result.modified_count
+
+    return {
+        "message": "Backfill completed",
+        "updated": updated,
+        "unresolved_names": sorted(unresolved),
+        "ambiguous_names": sorted(ambiguous)
+    }
+
+@api_router.post("/maintenance/assign-default-depot")
+async def assign_default_depot():
+    """Move documents created before depots into the default depot.
+
+    This also runs at startup; the endpoint is kept for re-running it by hand.
+    """
+    moved = await migrate_legacy_documents()
+    return {"message": "Default depot assigned", "depot_id": DEFAULT_DEPOT, "moved": moved}
 
 # ============= Include Router =============
 
 app.include_router(api_router)
 
+app.add_middleware(DepotPathMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -211,6 +614,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await register_depot(DEFAULT_DEPOT)
+    for depot_id in await list_depot_ids():
+        await ensure_depot(Depot(depot_id))
+    # Runs before any request, so pre-depot data is never hidden from the
+    # default depot and get_settings cannot create a duplicate settings doc
+    moved = await migrate_legacy_documents()
+    if any(moved.values()):
+        logger.info(f"Moved pre-depot documents into '{DEFAULT_DEPOT}': {moved}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
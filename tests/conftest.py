@@ -0,0 +1,47 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "lpg_test")
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Point the backend at a fresh in-memory Mongo for each test."""
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client[os.environ["DB_NAME"]])
+    monkeypatch.setattr(server, "_ready_depots", set())
+    return client
+
+
+@pytest.fixture
+def api(mongo):
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+def delivery_payload(employee_name, date="2026-02-17", **overrides):
+    payload = {
+        "date": date,
+        "employee_name": employee_name,
+        "cylinders_delivered": 10,
+        "empty_received": 9,
+        "online_payments": 4,
+        "paytm_payments": 2,
+        "partial_digital_amount": 500.0,
+        "cash_collected": 3000.0,
+        "calculated_cash_cylinders": 4,
+        "calculated_cash_amount": 3510.0,
+        "calculated_total_payable": 8775.0,
+    }
+    payload.update(overrides)
+    return payload
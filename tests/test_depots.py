@@ -0,0 +1,284 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from tests.conftest import delivery_payload
+
+STORAGE_MODES = ["shared", "collection", "database"]
+
+
+@pytest.fixture(params=STORAGE_MODES)
+def storage_mode(request, monkeypatch):
+    monkeypatch.setattr(server, "DEPOT_STORAGE", request.param)
+    return request.param
+
+
+@pytest.fixture
+def depot_api(mongo, storage_mode):
+    with TestClient(server.app) as test_client:
+        test_client.post("/api/depots", json={"depot_id": "north"})
+        test_client.post("/api/depots", json={"depot_id": "south"})
+        yield test_client
+
+
+def depot_headers(depot_id):
+    return {server.DEPOT_HEADER: depot_id}
+
+
+def set_price(api, price, **kwargs):
+    api.put("/api/settings", json={"cylinder_price": price}, **kwargs)
+
+
+def get_price(api, path="/api/settings", **kwargs):
+    return api.get(path, **kwargs).json()["cylinder_price"]
+
+
+# ============= Resolution =============
+
+def test_depot_resolved_from_header_path_or_default(depot_api):
+    set_price(depot_api, 900.0, headers=depot_headers("north"))
+    set_price(depot_api, 910.0, headers=depot_headers("south"))
+
+    assert get_price(depot_api, headers=depot_headers("north")) == 900.0
+    assert get_price(depot_api, "/api/depots/north/settings") == 900.0
+    assert get_price(depot_api, "/api/depots/south/settings") == 910.0
+    assert get_price(depot_api) == 877.5
+
+
+def test_path_prefix_wins_over_header(depot_api):
+    set_price(depot_api, 900.0, headers=depot_headers("north"))
+
+    price = get_price(depot_api, "/api/depots/north/settings", headers=depot_headers("south"))
+
+    assert price == 900.0
+
+
+def test_depot_id_is_case_insensitive(depot_api):
+    set_price(depot_api, 900.0, headers=depot_headers("North"))
+
+    assert get_price(depot_api, "/api/depots/NORTH/settings") == 900.0
+
+
+@pytest.mark.parametrize("depot_id", ["bad id", "semi;colon", "x" * 33])
+def test_invalid_depot_id_is_rejected(depot_api, depot_id):
+    assert depot_api.get("/api/settings", headers=depot_headers(depot_id)).status_code == 400
+    assert depot_api.post("/api/depots", json={"depot_id": depot_id}).status_code == 400
+
+
+def test_invalid_depot_id_in_path_is_rejected(depot_api):
+    assert depot_api.get("/api/depots/bad%21/settings").status_code == 400
+
+
+def test_database_name_length_is_checked(mongo, monkeypatch):
+    monkeypatch.setattr(server, "DEPOT_STORAGE", "database")
+    monkeypatch.setattr(server, "db", mongo["lpg_" + "d" * 40])
+    # One character over once joined as "<db name>_<depot id>"
+    depot_id = "x" * (server.MAX_DB_NAME_LENGTH - len(server.db.name))
+
+    with pytest.raises(ValueError):
+        server.normalize_depot_id(depot_id)
+    assert server.normalize_depot_id(depot_id[1:]) == depot_id[1:]
+
+
+def test_unknown_depot_is_not_created(depot_api):
+    assert depot_api.get("/api/settings", headers=depot_headers("typo")).status_code == 404
+    assert depot_api.get("/api/depots/typo/employees").status_code == 404
+    assert "typo" not in depot_api.get("/api/depots").json()["depots"]
+
+
+def test_depot_is_created_once(depot_api):
+    assert depot_api.post("/api/depots", json={"depot_id": "east"}).status_code == 200
+    assert depot_api.post("/api/depots", json={"depot_id": "East"}).status_code == 409
+
+    depots = depot_api.get("/api/depots").json()["depots"]
+    assert depots == [server.DEFAULT_DEPOT, "east", "north", "south"]
+
+
+def test_global_routes_reject_depot_prefix(depot_api):
+    assert depot_api.get("/api/depots/north/depots").status_code == 404
+    assert depot_api.get("/api/depots/north/rollups/summary/2026-02-17").status_code == 404
+    assert depot_api.post("/api/depots/north/maintenance/assign-default-depot").status_code == 404
+
+
+def test_middleware_keeps_raw_path_encoding():
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen.update(scope)
+
+    scope = {
+        "type": "http",
+        "path": "/api/depots/north/deliveries/date/2026-02-17",
+        "raw_path": b"/api/depots/north/deliveries/date/2026%2D02%2D17",
+    }
+    asyncio.run(server.DepotPathMiddleware(app)(scope, None, None))
+
+    assert seen["path"] == "/api/deliveries/date/2026-02-17"
+    assert seen["raw_path"] == b"/api/deliveries/date/2026%2D02%2D17"
+    assert seen["state"]["depot_id"] == "north"
+
+
+def test_settings_response_hides_depot_id(depot_api):
+    assert "depot_id" not in depot_api.get("/api/settings", headers=depot_headers("north")).json()
+
+
+# ============= Isolation =============
+
+def test_data_is_isolated_between_depots(depot_api):
+    north = depot_headers("north")
+    south = depot_headers("south")
+    employee_id = depot_api.post("/api/employees", json={"name": "Ramesh"}, headers=north).json()["id"]
+    delivery_id = depot_api.post("/api/deliveries", json=delivery_payload("Ramesh"), headers=north).json()["id"]
+
+    assert depot_api.get("/api/employees", headers=south).json() == []
+    assert depot_api.get("/api/deliveries/date/2026-02-17", headers=south).json() == []
+    assert depot_api.get("/api/deliveries/summary/2026-02-17", headers=south).json()["total_deliveries"] == 0
+    assert depot_api.delete(f"/api/employees/{employee_id}", headers=south).status_code == 404
+    response = depot_api.put(f"/api/deliveries/{delivery_id}", json=delivery_payload("Ramesh"), headers=south)
+    assert response.status_code == 404
+
+    # A same-named employee in another depot is not matched
+    delivery = depot_api.post("/api/deliveries", json=delivery_payload("Ramesh"), headers=south).json()
+    assert delivery["employee_id"] is None
+    assert len(depot_api.get("/api/deliveries/date/2026-02-17", headers=north).json()) == 1
+
+
+def test_rollup_totals_match_per_depot_summaries(depot_api):
+    date = "2026-02-17"
+    depot_api.post("/api/deliveries", json=delivery_payload("A", cylinders_delivered=5), headers=depot_headers("north"))
+    depot_api.post("/api/deliveries", json=delivery_payload("B", cylinders_delivered=7), headers=depot_headers("north"))
+    depot_api.post("/api/deliveries", json=delivery_payload("C", cash_collected=1234.5), headers=depot_headers("south"))
+    depot_api.post("/api/deliveries", json=delivery_payload("D", date="2026-02-18"), headers=depot_headers("south"))
+
+    rollup = depot_api.get(f"/api/rollups/summary/{date}").json()
+
+    assert set(rollup["depots"]) == {server.DEFAULT_DEPOT, "north", "south"}
+    per_depot = {
+        depot_id: depot_api.get(f"/api/depots/{depot_id}/deliveries/summary/{date}").json()
+        for depot_id in rollup["depots"]
+    }
+    assert rollup["depots"] == per_depot
+    for key, total in rollup["totals"].items():
+        assert total == sum(summary[key] for summary in per_depot.values())
+    assert rollup["totals"]["total_deliveries"] == 3
+    assert rollup["totals"]["total_cylinders_delivered"] == 22
+
+
+# ============= Legacy migration =============
+
+def insert_legacy(mongo, settings=None):
+    """Write documents the way the backend stored them before depots."""
+    db = server.db
+
+    async def insert():
+        if settings:
+            await db.settings.insert_one(settings)
+        employee = await db.employees.insert_one(
+            {"name": "Ramesh", "active": True, "created_at": datetime.utcnow()}
+        )
+        await db.deliveries.insert_one(
+            {**delivery_payload("Ramesh"), "employee_id": employee.inserted_id, "created_at": datetime.utcnow()}
+        )
+        return str(employee.inserted_id)
+
+    return asyncio.run(insert())
+
+
+def count_default_settings():
+    depot = server.Depot(server.DEFAULT_DEPOT)
+    return asyncio.run(depot.settings.count_documents(depot.scope()))
+
+
+def test_legacy_documents_move_to_default_depot_at_startup(mongo, storage_mode):
+    employee_id = insert_legacy(mongo, {
+        "cylinder_price": 950.0,
+        "price_history": [{"date": "2026-01-01T00:00:00", "price": 950.0}],
+        "updated_at": datetime(2026, 1, 1),
+    })
+
+    with TestClient(server.app) as api:
+        assert get_price(api) == 950.0
+        assert [e["id"] for e in api.get("/api/employees").json()] == [employee_id]
+        assert len(api.get(f"/api/employees/{employee_id}/deliveries").json()) == 1
+
+        # Already migrated, so running it again moves nothing
+        moved = api.post("/api/maintenance/assign-default-depot").json()["moved"]
+        assert moved == {"settings": 0, "employees": 0, "deliveries": 0}
+        assert get_price(api) == 950.0
+        assert len(api.get("/api/deliveries/date/2026-02-17").json()) == 1
+
+    assert count_default_settings() == 1
+
+
+def test_legacy_settings_merge_into_existing_default(mongo, storage_mode):
+    with TestClient(server.app) as api:
+        set_price(api, 877.5)
+
+    insert_legacy(mongo, {
+        "cylinder_price": 950.0,
+        "price_history": [{"date": "2026-01-01T00:00:00", "price": 950.0}],
+        "updated_at": datetime(2099, 1, 1),
+    })
+
+    with TestClient(server.app) as api:
+        settings = api.get("/api/settings").json()
+        assert settings["cylinder_price"] == 950.0
+        assert [entry["price"] for entry in settings["price_history"]] == [950.0, 877.5]
+
+    assert count_default_settings() == 1
+
+
+
+class StaleSettingsDb:
+    """Database whose settings cursor replays a snapshot, like a second
+    worker that listed the legacy settings before another worker merged them."""
+
+    def __init__(self, db, snapshot):
+        self._db = db
+        self._snapshot = snapshot
+
+    def __getattr__(self, name):
+        if name == "settings":
+            return StaleSettingsCollection(self._db.settings, self._snapshot)
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+class StaleSettingsCollection:
+    def __init__(self, collection, snapshot):
+        self._collection = collection
+        self._snapshot = snapshot
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def _replay(self):
+        for doc in self._snapshot:
+            yield dict(doc)
+
+    def find(self, *args, **kwargs):
+        return self._replay()
+
+
+def test_settings_merge_runs_once_across_workers(mongo, monkeypatch):
+    with TestClient(server.app) as api:
+        set_price(api, 877.5)
+    db = server.db
+    asyncio.run(db.settings.insert_one({
+        "cylinder_price": 950.0,
+        "price_history": [{"date": "2026-01-01T00:00:00", "price": 950.0}],
+        "updated_at": datetime(2099, 1, 1),
+    }))
+    snapshot = asyncio.run(db.settings.find({"depot_id": {"$exists": False}}).to_list(None))
+
+    assert asyncio.run(server.migrate_legacy_documents())["settings"] == 1
+    monkeypatch.setattr(server, "db", StaleSettingsDb(db, snapshot))
+    assert asyncio.run(server.migrate_legacy_documents())["settings"] == 0
+
+    settings = asyncio.run(db.settings.find_one({"depot_id": server.DEFAULT_DEPOT}))
+    assert [entry["price"] for entry in settings["price_history"]] == [950.0, 877.5]
@@ -0,0 +1,161 @@
+import asyncio
+from datetime import datetime
+
+import server
+from tests.conftest import delivery_payload
+
+
+def create_employee(api, name):
+    return api.post("/api/employees", json={"name": name}).json()["id"]
+
+
+def test_name_resolves_to_active_employee(api):
+    retired = create_employee(api, "Ramesh")
+    api.delete(f"/api/employees/{retired}")
+    active = create_employee(api, "Ramesh")
+
+    delivery = api.post("/api/deliveries", json=delivery_payload("Ramesh")).json()
+
+    assert delivery["employee_id"] == active
+
+
+def test_unknown_name_is_stored_without_id(api):
+    delivery = api.post("/api/deliveries", json=delivery_payload("Nobody")).json()
+
+    assert delivery["employee_id"] is None
+    assert delivery["employee_name"] == "Nobody"
+
+
+def test_ambiguous_name_is_rejected(api):
+    create_employee(api, "Suresh")
+    create_employee(api, "Suresh")
+
+    response = api.post("/api/deliveries", json=delivery_payload("Suresh"))
+
+    assert response.status_code == 409
+
+
+def test_explicit_id_overrides_name(api):
+    employee_id = create_employee(api, "Mahesh")
+
+    delivery = api.post(
+        "/api/deliveries",
+        json=delivery_payload("Someone Else", employee_id=employee_id)
+    ).json()
+
+    assert delivery["employee_id"] == employee_id
+    assert delivery["employee_name"] == "Mahesh"
+
+
+def test_malformed_ids_are_rejected(api):
+    assert api.get("/api/employees/not-an-id/deliveries").status_code == 400
+    assert api.get("/api/employees/not-an-id/summary").status_code == 400
+    assert api.delete("/api/employees/not-an-id").status_code == 400
+    assert api.put("/api/deliveries/not-an-id", json=delivery_payload("Ramesh")).status_code == 400
+    response = api.post("/api/deliveries", json=delivery_payload("Ramesh", employee_id="bad"))
+    assert response.status_code == 400
+
+
+def test_history_and_summary_filter_by_date_range(api):
+    employee_id = create_employee(api, "Ramesh")
+    create_employee(api, "Dinesh")
+    for date in ("2026-02-01", "2026-02-10", "2026-02-20"):
+        api.post("/api/deliveries", json=delivery_payload("Ramesh", date=date))
+    api.post("/api/deliveries", json=delivery_payload("Dinesh", date="2026-02-10"))
+
+    history = api.get(
+        f"/api/employees/{employee_id}/deliveries",
+        params={"start_date": "2026-02-05", "end_date": "2026-02-20"}
+    ).json()
+    summary = api.get(
+        f"/api/employees/{employee_id}/summary",
+        params={"start_date": "2026-02-05"}
+    ).json()
+
+    assert [d["date"] for d in history] == ["2026-02-20", "2026-02-10"]
+    assert summary["employee_id"] == employee_id
+    assert summary["total_deliveries"] == 2
+    assert summary["total_cylinders_delivered"] == 20
+
+
+def test_summary_without_deliveries_is_zero(api):
+    employee_id = create_employee(api, "Ramesh")
+
+    summary = api.get(f"/api/employees/{employee_id}/summary").json()
+
+    assert summary["total_deliveries"] == 0
+    assert summary["total_cash_collected"] == 0
+
+
+def test_backfill_resolves_existing_deliveries(api):
+    ramesh = create_employee(api, "Ramesh")
+    create_employee(api, "Suresh")
+    create_employee(api, "Suresh")
+
+    # Rows written before deliveries carried an employee_id
+    legacy = [
+        {**delivery_payload(name), "depot_id": server.DEFAULT_DEPOT, "created_at": datetime.utcnow()}
+        for name in ("Ramesh", "Ramesh", "Suresh", "Gone")
+    ]
+    asyncio.run(server.Depot(server.DEFAULT_DEPOT).deliveries.insert_many(legacy))
+
+    result = api.post("/api/maintenance/backfill-employee-ids").json()
+
+    assert result["updated"] == 2
+    assert result["unresolved_names"] == ["Gone"]
+    assert result["ambiguous_names"] == ["Suresh"]
+    history = api.get(f"/api/employees/{ramesh}/deliveries").json()
+    assert len(history) == 2
+
+
+def test_unknown_employee_history_and_summary_return_404(api):
+    missing = "0123456789abcdef01234567"
+
+    assert api.get(f"/api/employees/{missing}/deliveries").status_code == 404
+    assert api.get(f"/api/employees/{missing}/summary").status_code == 404
+
+
+def test_edit_keeps_employee_after_namesake_is_hired(api):
+    first = create_employee(api, "Ramesh")
+    delivery = api.post("/api/deliveries", json=delivery_payload("Ramesh")).json()
+    api.delete(f"/api/employees/{first}")
+    second = create_employee(api, "Ramesh")
+
+    response = api.put(
+        f"/api/deliveries/{delivery['id']}",
+        json=delivery_payload("Ramesh", cylinders_delivered=12)
+    )
+    assert response.status_code == 200
+    assert len(api.get(f"/api/employees/{first}/deliveries").json()) == 1
+    assert api.get(f"/api/employees/{second}/deliveries").json() == []
+
+    # Even with two active namesakes the stored reference is kept
+    create_employee(api, "Ramesh")
+    response = api.put(f"/api/deliveries/{delivery['id']}", json=delivery_payload("Ramesh"))
+    assert response.status_code == 200
+    assert len(api.get(f"/api/employees/{first}/deliveries").json()) == 1
+
+
+def test_edit_with_new_name_resolves_again(api):
+    create_employee(api, "Ramesh")
+    dinesh = create_employee(api, "Dinesh")
+    delivery = api.post("/api/deliveries", json=delivery_payload("Ramesh")).json()
+
+    api.put(f"/api/deliveries/{delivery['id']}", json=delivery_payload("Dinesh"))
+
+    history = api.get(f"/api/employees/{dinesh}/deliveries").json()
+    assert [d["id"] for d in history] == [delivery["id"]]
+
+
+def test_backfill_treats_reused_name_as_ambiguous(api):
+    former = create_employee(api, "Mahesh")
+    api.delete(f"/api/employees/{former}")
+    create_employee(api, "Mahesh")
+
+    legacy = {**delivery_payload("Mahesh"), "depot_id": server.DEFAULT_DEPOT, "created_at": datetime.utcnow()}
+    asyncio.run(server.Depot(server.DEFAULT_DEPOT).deliveries.insert_one(legacy))
+
+    result = api.post("/api/maintenance/backfill-employee-ids").json()
+
+    assert result["updated"] == 0
+    assert result["ambiguous_names"] == ["Mahesh"]